@@ -1,20 +1,78 @@
 #!/usr/bin/env python3
 """Terminal-based CLI chatbot with streaming responses."""
 
+import asyncio
+import contextlib
+import inspect
+import os
 import sys
 import time
-from typing import Generator, Optional
+from collections.abc import AsyncGenerator, Awaitable, Callable, Coroutine
+from typing import Any, Optional
 
-from langchain_core.messages import AIMessage, HumanMessage
+import httpx
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_ollama import ChatOllama
-from ollama import Client
+from ollama import AsyncClient
 from prompt_toolkit import PromptSession
 from prompt_toolkit.history import FileHistory
 from prompt_toolkit.styles import Style
-from rich.console import Console
+from rich.console import Console, RenderableType
 from rich.live import Live
-from rich.markdown import Markdown
 from rich.panel import Panel
+from rich.spinner import Spinner
+from rich.text import Text
+
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+
+# Model listings are reused for a few seconds so that back-to-back commands
+# (/models, /switch) don't each pay a round trip to the Ollama server.
+_MODELS_CACHE_TTL = 5.0
+_models_cache: tuple[float, list[str]] | None = None
+_async_client: AsyncClient | None = None
+
+# Streamed output is re-rendered at most once per interval, and only the last
+# few KB stay in the live area; earlier paragraphs are printed once and left alone.
+_FLUSH_INTERVAL = 0.05
+_MAX_LIVE_CHARS = 2048
+_MD_SIGILS = frozenset("`*_#>-|[")
+
+_PROMPT_STYLE = Style.from_dict({"prompt": "#4a9eff bold"})
+
+_EXIT_COMMANDS = frozenset({"/quit", "/exit", "/q"})
+
+_SUMMARY_PROMPT = (
+    "Summarize the conversation below in a few sentences. Keep any names, facts, "
+    "and decisions the user may refer back to."
+)
+
+# Ask Ollama to keep the model loaded between turns instead of its 5 minute default
+_MODEL_KEEP_ALIVE = "30m"
+
+# httpx drops idle connections after 5s by default, which is shorter than the
+# pause between most chat turns; keep them around so each turn skips the handshake.
+_LLM_CLIENT_KWARGS = {"limits": httpx.Limits(keepalive_expiry=300.0)}
+
+
+def _get_async_client() -> AsyncClient:
+    """Return the shared Ollama async client, creating it on first use."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncClient(host=OLLAMA_HOST)
+    return _async_client
+
+
+async def _fetch_models() -> list[str]:
+    """Fetch installed model names, reusing a listing younger than the cache TTL."""
+    global _models_cache
+    now = time.monotonic()
+    if _models_cache is not None and now - _models_cache[0] < _MODELS_CACHE_TTL:
+        return _models_cache[1]
+
+    response = await _get_async_client().list()
+    models = [model.model for model in response.models]
+    _models_cache = (now, models)
+    return models
 
 
 class CliChatbot:
@@ -26,16 +84,41 @@ class CliChatbot:
         self.temperature = temperature
         self.llm: Optional[ChatOllama] = None
         self.messages: list = []
+        # Only the last max_turns turns are sent verbatim; older ones are folded
+        # into a rolling summary so prompt size stays bounded in long sessions.
+        self.max_turns = 8
+        self.summary = ""
+        self._summarized = 0
+        self._summary_task: asyncio.Task | None = None
+        # Strong references keep fire-and-forget tasks from being garbage collected
+        self._background_tasks: set[asyncio.Task] = set()
+        self._commands: dict[str, Callable[[], Awaitable[None] | None]] = {
+            "/help": self.display_help,
+            "/clear": self.clear_history,
+            "/models": self.display_models,
+            "/switch": self.switch_model,
+            "/temp": self.change_temperature,
+        }
         self.session = PromptSession(
             history=FileHistory(".chat_history"),
-            style=Style.from_dict({"prompt": "#4a9eff bold"}),
+            style=_PROMPT_STYLE,
         )
 
-    def check_ollama_connection(self) -> bool:
-        """Check if Ollama server is running."""
+    def _spawn(self, coro: Coroutine[Any, Any, None]) -> asyncio.Task:
+        """Run a coroutine in the background while the chat loop carries on."""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def check_ollama_connection(self) -> bool:
+        """Check if Ollama server is running.
+
+        A successful model listing doubles as the health check and primes the
+        model cache, so startup costs a single round trip.
+        """
         try:
-            client = Client(host="http://localhost:11434")
-            client.list()
+            await _fetch_models()
             return True
         except Exception as e:
             self.console.print(
@@ -49,12 +132,10 @@ class CliChatbot:
             )
             return False
 
-    def get_available_models(self) -> list[str]:
+    async def get_available_models(self) -> list[str]:
         """Fetch available models from Ollama."""
         try:
-            client = Client(host="http://localhost:11434")
-            response = client.list()
-            return [model.model for model in response.models]
+            return await _fetch_models()
         except Exception:
             return []
 
@@ -64,8 +145,11 @@ class CliChatbot:
             self.llm = ChatOllama(
                 model=self.model_name,
                 temperature=self.temperature,
-                base_url="http://localhost:11434",
+                base_url=OLLAMA_HOST,
+                client_kwargs=_LLM_CLIENT_KWARGS,
+                keep_alive=_MODEL_KEEP_ALIVE,
             )
+            self._spawn(self._warm_up(self.llm))
             return True
         except Exception as e:
             self.console.print(
@@ -77,18 +161,139 @@ class CliChatbot:
             )
             return False
 
-    def stream_response(self, user_input: str) -> Generator[str, None, None]:
-        """Stream the LLM response chunk by chunk."""
+    async def _warm_up(self, llm: ChatOllama):
+        """Have Ollama load the model now, so the first reply doesn't pay for it.
+
+        Ollama loads weights lazily on the first request; a one-token request in
+        the background moves that load off the user's first turn.
+        """
+        # Failures are ignored here; a real problem surfaces on the first request
+        with contextlib.suppress(Exception):
+            await llm.ainvoke([HumanMessage(content="hi")], options={"num_predict": 1})
+
+    async def stream_response(self, messages: list) -> AsyncGenerator[str, None]:
+        """Stream the LLM response to the conversation chunk by chunk.
+
+        The whole history is sent so the model keeps context, and Ollama can
+        reuse its cached prompt prefix from the previous turn. Errors are
+        raised to the caller.
+        """
         if self.llm is None:
-            yield "Error: LLM not initialized"
-            return
+            raise RuntimeError("LLM not initialized")
+
+        async for chunk in self.llm.astream(messages):
+            # astream always yields AIMessageChunk, so content is always present
+            if content := chunk.content:
+                yield content
+
+    async def _stream_to_live(self, messages: list, live: Live) -> str | None:
+        """Stream a response into the live display and return the full text.
+
+        Returns None if the stream failed; the error is shown in the live area.
 
+        Re-rendering parses the whole pending text as Markdown, so renders are
+        throttled to one per flush interval (or paragraph break), and long
+        responses hand their finished paragraphs off to be printed once.
+        """
+        from rich.markdown import Markdown
+
+        response_text = ""
+        committed = 0
+        last_flush = 0.0
+        # Plain text is shown as-is until the first Markdown character appears,
+        # which saves a Markdown parse per render for most short replies.
+        render: Callable[[str], RenderableType] = Text
         try:
-            for chunk in self.llm.stream([HumanMessage(content=user_input)]):
-                if hasattr(chunk, "content") and chunk.content:
-                    yield chunk.content
+            async for chunk in self.stream_response(messages):
+                response_text += chunk
+                if render is Text and any(sigil in chunk for sigil in _MD_SIGILS):
+                    render = Markdown
+                now = time.monotonic()
+                if now - last_flush < _FLUSH_INTERVAL and "\n\n" not in chunk:
+                    continue
+                committed = self._commit_paragraphs(response_text, committed, live, render)
+                live.update(render(response_text[committed:]))
+                last_flush = now
         except Exception as e:
-            yield f"\n[Error: {e}]"
+            # The error is only displayed, never returned, so it can't end up in
+            # the history or the rolling summary
+            live.update(render(f"{response_text[committed:]}\n[Error: {e}]"))
+            return None
+
+        live.update(render(response_text[committed:]))
+        return response_text
+
+    def _commit_paragraphs(
+        self,
+        text: str,
+        committed: int,
+        live: Live,
+        render: Callable[[str], RenderableType],
+    ) -> int:
+        """Print finished paragraphs above the live area once it grows too large.
+
+        Returns the new offset into ``text`` up to which output has been printed.
+        """
+        pending = text[committed:]
+        if len(pending) <= _MAX_LIVE_CHARS:
+            return committed
+
+        split = pending.rfind("\n\n")
+        # Never split inside an open code fence, or both halves render wrong.
+        if split <= 0 or pending.count("```", 0, split) % 2:
+            return committed
+
+        live.console.print(render(pending[:split]))
+        return committed + split + 2
+
+    def _context_messages(self) -> list:
+        """Return the messages to send: the rolling summary plus the recent turns."""
+        # The window ends on the pending user message, so it starts on one too
+        window = self.messages[-(2 * self.max_turns - 1) :]
+        if not self.summary:
+            return window
+        return [
+            SystemMessage(content=f"Summary of the earlier conversation:\n{self.summary}"),
+            *window,
+        ]
+
+    def _summarize_overflow(self):
+        """Fold messages that will drop out of the next turn's window into the summary.
+
+        The summary request runs as a background task so it happens while the
+        user reads or types rather than ahead of the next reply.
+        """
+        cutoff = len(self.messages) - 2 * self.max_turns + 2
+        if self.llm is None or cutoff <= self._summarized:
+            return
+        if self._summary_task is not None and not self._summary_task.done():
+            return
+
+        self._summary_task = self._spawn(
+            self._update_summary(self.messages, self.summary, self._summarized, cutoff)
+        )
+
+    async def _update_summary(self, messages: list, summary: str, start: int, end: int):
+        """Summarize ``messages[start:end]`` on top of the previous summary."""
+        transcript = "\n".join(
+            f"{'User' if isinstance(m, HumanMessage) else 'Assistant'}: {m.content}"
+            for m in messages[start:end]
+        )
+        if summary:
+            transcript = f"Earlier summary:\n{summary}\n\n{transcript}"
+
+        try:
+            result = await self.llm.ainvoke(
+                [SystemMessage(content=_SUMMARY_PROMPT), HumanMessage(content=transcript)]
+            )
+        except Exception:
+            # Keep the previous summary; the next turn retries with a wider range
+            return
+
+        # Discard the result if the history was cleared in the meantime
+        if messages is self.messages:
+            self.summary = result.content
+            self._summarized = end
 
     def display_welcome(self):
         """Display welcome message and setup info."""
@@ -131,9 +336,9 @@ Type [bold]/quit[/bold] or press [bold]Ctrl+C[/bold] to exit.
         """
         self.console.print(Panel(help_text, title="Help", border_style="cyan"))
 
-    def display_models(self):
+    async def display_models(self):
         """Display available models."""
-        models = self.get_available_models()
+        models = await self.get_available_models()
         if models:
             models_text = "\n".join(f"  • {model}" for model in models)
             self.console.print(
@@ -155,9 +360,9 @@ Type [bold]/quit[/bold] or press [bold]Ctrl+C[/bold] to exit.
                 )
             )
 
-    def switch_model(self):
+    async def switch_model(self):
         """Switch to a different model."""
-        models = self.get_available_models()
+        models = await self.get_available_models()
         if not models:
             self.console.print("[yellow]No models available. Install a model first.[/yellow]")
             return
@@ -167,7 +372,7 @@ Type [bold]/quit[/bold] or press [bold]Ctrl+C[/bold] to exit.
             self.console.print(f"  {i}. {model}")
 
         try:
-            choice = self.session.prompt("\nEnter model number or name: ")
+            choice = await self.session.prompt_async("\nEnter model number or name: ")
             if choice.isdigit():
                 idx = int(choice) - 1
                 if 0 <= idx < len(models):
@@ -187,17 +392,22 @@ Type [bold]/quit[/bold] or press [bold]Ctrl+C[/bold] to exit.
         except (KeyboardInterrupt, EOFError):
             self.console.print("\n[yellow]Model switch cancelled.[/yellow]")
 
-    def change_temperature(self):
+    async def change_temperature(self):
         """Change the temperature setting."""
         try:
-            temp_input = self.session.prompt(
+            temp_input = await self.session.prompt_async(
                 f"\nCurrent temperature: {self.temperature}\nEnter new temperature (0.0-1.0): "
             )
             temp = float(temp_input)
             if 0.0 <= temp <= 1.0:
                 self.temperature = temp
-                if self.initialize_llm():
-                    self.console.print(f"[green]Temperature set to:[/green] {self.temperature}")
+                # Temperature is read per request, so update the live instance
+                # rather than rebuilding it and its HTTP clients.
+                if self.llm is not None:
+                    self.llm.temperature = temp
+                elif not self.initialize_llm():
+                    return
+                self.console.print(f"[green]Temperature set to:[/green] {self.temperature}")
             else:
                 self.console.print("[red]Temperature must be between 0.0 and 1.0.[/red]")
         except ValueError:
@@ -205,24 +415,26 @@ Type [bold]/quit[/bold] or press [bold]Ctrl+C[/bold] to exit.
         except (KeyboardInterrupt, EOFError):
             self.console.print("\n[yellow]Temperature change cancelled.[/yellow]")
 
-    def handle_command(self, command: str) -> bool:
+    def clear_history(self):
+        """Clear the conversation and its rolling summary."""
+        self.messages = []
+        self.summary = ""
+        self._summarized = 0
+        self.console.clear()
+        self.console.print("[green]Chat history cleared.[/green]")
+
+    async def handle_command(self, command: str) -> bool:
         """Handle special commands like /help, /clear, etc."""
         command = command.lower().strip()
 
-        if command in ["/quit", "/exit", "/q"]:
+        if command in _EXIT_COMMANDS:
             return False
-        elif command == "/help":
-            self.display_help()
-        elif command == "/clear":
-            self.messages = []
-            self.console.clear()
-            self.console.print("[green]Chat history cleared.[/green]")
-        elif command == "/models":
-            self.display_models()
-        elif command == "/switch":
-            self.switch_model()
-        elif command == "/temp":
-            self.change_temperature()
+
+        handler = self._commands.get(command)
+        if handler is not None:
+            result = handler()
+            if inspect.isawaitable(result):
+                await result
         else:
             self.console.print(
                 f"[red]Unknown command:[/red] {command}\n"
@@ -231,9 +443,13 @@ Type [bold]/quit[/bold] or press [bold]Ctrl+C[/bold] to exit.
 
         return True
 
-    def run(self):
-        """Run the main chat loop."""
-        if not self.check_ollama_connection():
+    async def run(self):
+        """Run the main chat loop.
+
+        Input is read with prompt_async, so background work (model warm-up,
+        history summaries) proceeds while the user types.
+        """
+        if not await self.check_ollama_connection():
             return
 
         if not self.initialize_llm():
@@ -244,7 +460,7 @@ Type [bold]/quit[/bold] or press [bold]Ctrl+C[/bold] to exit.
         try:
             while True:
                 try:
-                    user_input: str = self.session.prompt("\n> ")
+                    user_input: str = await self.session.prompt_async("\n> ")
                 except KeyboardInterrupt:
                     self.console.print("\n[yellow]Use /quit to exit.[/yellow]")
                     continue
@@ -255,7 +471,7 @@ Type [bold]/quit[/bold] or press [bold]Ctrl+C[/bold] to exit.
                     continue
 
                 if user_input.startswith("/"):
-                    if not self.handle_command(user_input):
+                    if not await self.handle_command(user_input):
                         break
                     continue
 
@@ -269,22 +485,31 @@ Type [bold]/quit[/bold] or press [bold]Ctrl+C[/bold] to exit.
 
                 self.messages.append(HumanMessage(content=user_input))
 
-                with self.console.status("[bold green]Thinking...", spinner="dots") as status:
-                    time.sleep(0.3)
-
                 self.console.print("\n[bold green]Assistant:[/bold green]\n")
 
-                response_text = ""
-                with Live(console=self.console, refresh_per_second=20, transient=False) as live:
-                    for chunk in self.stream_response(user_input):
-                        response_text += chunk
-                        live.update(Markdown(response_text))
-
-                self.messages.append(AIMessage(content=response_text))
+                # The spinner stays up only until the first token arrives, so the
+                # wait the user sees is the model's real time to first token.
+                thinking = Spinner("dots", text="[bold green]Thinking...")
+                with Live(
+                    thinking, console=self.console, refresh_per_second=10, transient=False
+                ) as live:
+                    response_text = await self._stream_to_live(self._context_messages(), live)
+
+                if response_text is None:
+                    # Drop the unanswered message so the history keeps alternating
+                    self.messages.pop()
+                else:
+                    self.messages.append(AIMessage(content=response_text))
+                    self._summarize_overflow()
                 self.console.print()
 
         except KeyboardInterrupt:
             self.console.print("\n\n[yellow]Goodbye![/yellow]")
+        except asyncio.CancelledError:
+            # asyncio.run() turns Ctrl+C during a reply into cancellation of this
+            # task; say goodbye, but let the cancellation complete
+            self.console.print("\n\n[yellow]Goodbye![/yellow]")
+            raise
         except Exception as e:
             self.console.print(f"\n[red]Error:[/red] {e}")
         finally:
@@ -317,7 +542,9 @@ def main():
         sys.exit(1)
 
     chatbot = CliChatbot(model_name=args.model, temperature=args.temperature)
-    chatbot.run()
+    # asyncio.run() re-raises a Ctrl+C that cancelled run(), which already said goodbye
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(chatbot.run())
 
 
 if __name__ == "__main__":
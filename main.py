@@ -6,24 +6,38 @@ This script provides a unified entry point that can launch either:
 - UI/Web mode: Streamlit-based web interface
 """
 
-import sys
 import argparse
+import os
+import sys
 
 
 def run_cli_mode(model: str, temperature: float):
     """Run the CLI chatbot."""
+    import asyncio
+    import contextlib
+
     from cli_chatbot import CliChatbot
 
     chatbot = CliChatbot(model_name=model, temperature=temperature)
-    chatbot.run()
+    # asyncio.run() re-raises a Ctrl+C that cancelled run(), which already said goodbye
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(chatbot.run())
 
 
-def run_ui_mode():
+def run_ui_mode(model: str, temperature: float):
     """Run the Streamlit web UI chatbot."""
-    import subprocess
+    from streamlit.web import cli as stcli
+
+    # The app runs in this process, so hand the CLI settings over through the
+    # environment; streamlit_chatbot.setup_sidebar() uses them as defaults.
+    os.environ["CHATBOT_MODEL"] = model
+    os.environ["CHATBOT_TEMPERATURE"] = str(temperature)
 
-    # Launch Streamlit with the streamlit_chatbot.py file
-    subprocess.run([sys.executable, "-m", "streamlit", "run", "streamlit_chatbot.py"])
+    # Serve the app in-process rather than spawning a second interpreter. Going
+    # through Streamlit's own "run" command keeps STREAMLIT_* environment
+    # variables (e.g. STREAMLIT_SERVER_PORT) and config files working.
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "streamlit_chatbot.py")
+    stcli.main(["run", app_path], prog_name="streamlit")
 
 
 def main():
@@ -62,7 +76,7 @@ Notes:
     parser.add_argument(
         "--model",
         default="gemma3:270m",
-        help="Ollama model to use (CLI mode only). Default: gemma3:270m",
+        help="Ollama model to use (preselected in UI/Web mode if installed). Default: gemma3:270m",
     )
 
     parser.add_argument(
@@ -70,7 +84,7 @@ Notes:
         "-t",
         type=float,
         default=0.7,
-        help="Temperature setting 0.0-1.0 (CLI mode only). Default: 0.7",
+        help="Temperature setting 0.0-1.0 (initial slider value in UI/Web mode). Default: 0.7",
     )
 
     args = parser.parse_args()
@@ -84,12 +98,7 @@ Notes:
     if args.mode == "cli":
         run_cli_mode(model=args.model, temperature=args.temperature)
     elif args.mode in ["ui", "web"]:
-        if args.model != "gemma3:270m" or args.temperature != 0.7:
-            print(
-                "Note: --model and --temperature options are ignored in UI/Web mode. "
-                "Use the UI controls to configure these settings."
-            )
-        run_ui_mode()
+        run_ui_mode(model=args.model, temperature=args.temperature)
 
 
 if __name__ == "__main__":
@@ -1,34 +1,183 @@
 #!/usr/bin/env python3
 """Streamlit-based web UI chatbot."""
 
+import asyncio
+import contextlib
+import functools
+import html
+import io
+import math
+import os
+import threading
+import urllib.parse
+
 import streamlit as st
 from langchain_core.messages import AIMessage, HumanMessage
-from langchain_ollama import ChatOllama
-from ollama import Client
+
+
+def _ollama_host():
+    """Ollama server URL, overridable through the OLLAMA_HOST environment variable
+
+    Ollama accepts bare values such as ``0.0.0.0`` or ``host:11434``; they are
+    completed the same way the ollama client does, since httpx needs a full URL.
+    """
+    host = os.environ.get("OLLAMA_HOST", "").strip()
+    if not host:
+        return "http://localhost:11434"
+
+    scheme, _, rest = host.partition("://")
+    if not rest:
+        scheme, rest, default_port = "http", host, 11434
+    else:
+        default_port = {"http": 80, "https": 443}.get(scheme, 11434)
+
+    split = urllib.parse.urlsplit(f"{scheme}://{rest}")
+    hostname = split.hostname or "127.0.0.1"
+    if ":" in hostname:
+        # urlsplit drops the brackets around IPv6 addresses
+        hostname = f"[{hostname}]"
+    url = f"{scheme}://{hostname}:{split.port or default_port}"
+    if path := split.path.strip("/"):
+        url += f"/{path}"
+    return url
+
+
+OLLAMA_HOST = _ollama_host()
+
+_PAGE_CSS = """
+<style>
+.main {
+    background-color: #0e1117;
+}
+.stTextInput > div > div > input {
+    background-color: #1e1e1e;
+    color: white;
+}
+.chat-message {
+    padding: 1.5rem;
+    border-radius: 0.8rem;
+    margin-bottom: 1rem;
+    display: flex;
+    flex-direction: column;
+}
+.user-message {
+    background-color: #1e3a5f;
+    border-left: 4px solid #4a9eff;
+}
+.assistant-message {
+    background-color: #1e2d1e;
+    border-left: 4px solid #4ade80;
+}
+.message-header {
+    font-weight: bold;
+    margin-bottom: 0.5rem;
+    font-size: 0.9rem;
+}
+.stButton > button {
+    background-color: #4a9eff;
+    color: white;
+    border-radius: 0.5rem;
+    border: none;
+    padding: 0.5rem 2rem;
+    font-weight: 600;
+}
+.stButton > button:hover {
+    background-color: #3b7fd9;
+}
+</style>
+"""
+
+_USER_TMPL = (
+    '<div class="chat-message user-message">'
+    '<div class="message-header">👤 You</div>'
+    "<div>{content}</div>"
+    "</div>"
+)
+_AI_TMPL = (
+    '<div class="chat-message assistant-message">'
+    '<div class="message-header">🤖 Assistant</div>'
+    "<div>{content}</div>"
+    "</div>"
+)
+_TEMPLATES = {HumanMessage: _USER_TMPL, AIMessage: _AI_TMPL}
 
 
 def initialize_session_state():
     """Initialize session state variables"""
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "rendered" not in st.session_state or "rendered_buffer" not in st.session_state:
+        _reset_rendered()
     if "llm" not in st.session_state:
         st.session_state.llm = None
+    if "prewarmed" not in st.session_state:
+        st.session_state.prewarmed = True
+        threading.Thread(target=_prewarm_ollama, daemon=True).start()
+
+
+def _prewarm_ollama():
+    """Touch the Ollama server once per session, off the script thread"""
+    # Imported here so the import cost is paid in this thread, not the script run
+    import httpx
+
+    # Best effort only; connection problems are reported by the model list
+    with contextlib.suppress(Exception):
+        httpx.head(OLLAMA_HOST, timeout=2)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_ollama_client(host):
+    """Return a shared Ollama client so its pooled connections are reused"""
+    # Imported here so page loads served from the model cache never import ollama
+    from ollama import Client
+
+    return Client(host=host)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _list_models():
+    """List installed model names, cached until the sidebar's refresh button clears it"""
+    response = _get_ollama_client(OLLAMA_HOST).list()
+    # A tuple is hashable, so the listing can itself be used as a cache key
+    return tuple(model.model for model in response.models)
 
 
 def get_available_models():
     """Fetch available models from local Ollama instance
 
+    Successful listings are cached; failures are not, so the app recovers on
+    the next rerun once Ollama is reachable again.
+
     Returns:
-        tuple: (success: bool, models: List[str], error_message: str)
+        tuple: (success: bool, models: Tuple[str, ...], error_message: str)
     """
     try:
-        client = Client(host="http://localhost:11434")
-        response = client.list()
-        model_names = [model.model for model in response.models]
-        return (True, model_names, "")
+        return (True, _list_models(), "")
     except Exception as e:
         error_msg = f"Failed to connect to Ollama: {e!s}"
-        return (False, [], error_msg)
+        return (False, (), error_msg)
+
+
+async def aget_available_models(hosts=(OLLAMA_HOST,)):
+    """Fetch available models from several Ollama instances concurrently
+
+    Listings are not cached, so this suits one-off probes such as health checks.
+
+    Returns:
+        list: one (success: bool, models: Tuple[str, ...], error_message: str)
+        tuple per host, in the order given
+    """
+    from ollama import AsyncClient
+
+    async def _list_host(host):
+        try:
+            async with AsyncClient(host=host) as client:
+                response = await client.list()
+            return (True, tuple(model.model for model in response.models), "")
+        except Exception as e:
+            return (False, (), f"Failed to connect to Ollama at {host}: {e!s}")
+
+    return await asyncio.gather(*(_list_host(host) for host in hosts))
 
 
 def setup_page():
@@ -39,51 +188,19 @@ def setup_page():
         initial_sidebar_state="expanded",
     )
 
-    st.markdown(
-        """
-        <style>
-        .main {
-            background-color: #0e1117;
-        }
-        .stTextInput > div > div > input {
-            background-color: #1e1e1e;
-            color: white;
-        }
-        .chat-message {
-            padding: 1.5rem;
-            border-radius: 0.8rem;
-            margin-bottom: 1rem;
-            display: flex;
-            flex-direction: column;
-        }
-        .user-message {
-            background-color: #1e3a5f;
-            border-left: 4px solid #4a9eff;
-        }
-        .assistant-message {
-            background-color: #1e2d1e;
-            border-left: 4px solid #4ade80;
-        }
-        .message-header {
-            font-weight: bold;
-            margin-bottom: 0.5rem;
-            font-size: 0.9rem;
-        }
-        .stButton > button {
-            background-color: #4a9eff;
-            color: white;
-            border-radius: 0.5rem;
-            border: none;
-            padding: 0.5rem 2rem;
-            font-weight: 600;
-        }
-        .stButton > button:hover {
-            background-color: #3b7fd9;
-        }
-        </style>
-    """,
-        unsafe_allow_html=True,
-    )
+    st.markdown(_PAGE_CSS, unsafe_allow_html=True)
+
+
+def _default_temperature():
+    """Slider default passed by main.py, or 0.7 if it isn't a usable number"""
+    try:
+        temperature = float(os.environ.get("CHATBOT_TEMPERATURE", 0.7))
+    except ValueError:
+        return 0.7
+    if math.isnan(temperature):
+        return 0.7
+    # st.slider raises for values outside its range
+    return min(max(temperature, 0.0), 1.0)
 
 
 def setup_sidebar():
@@ -94,6 +211,10 @@ def setup_sidebar():
 
         st.markdown("### Model Configuration")
 
+        # Drop the cached model list before fetching so new installs show up
+        if st.button("🔄 Refresh Models"):
+            _list_models.clear()
+
         # Fetch available models from Ollama
         success, model_options, error_msg = get_available_models()
 
@@ -102,7 +223,7 @@ def setup_sidebar():
             # Ollama is not running - show error
             st.error(error_msg)
             st.info("Make sure Ollama is running. Start it with: `ollama serve`")
-            model_options = []  # Empty list
+            model_options = ()  # No models
         elif len(model_options) == 0:
             # Ollama is running but no models installed
             st.warning("No models found in Ollama.")
@@ -110,9 +231,14 @@ def setup_sidebar():
 
         # Only show selectbox if models are available
         if len(model_options) > 0:
+            # main.py passes --model through the environment when launching the UI
+            preferred_model = os.environ.get("CHATBOT_MODEL")
             selected_model = st.selectbox(
                 "Select Model",
                 model_options,
+                index=model_options.index(preferred_model)
+                if preferred_model in model_options
+                else 0,
                 help="Choose from your installed Ollama models",
             )
         else:
@@ -123,7 +249,7 @@ def setup_sidebar():
             "Createtivity (Temperature)",
             min_value=0.0,
             max_value=1.0,
-            value=0.7,
+            value=_default_temperature(),
             step=0.1,
             help="Higher values make output more creative",
         )
@@ -132,6 +258,7 @@ def setup_sidebar():
 
         if st.button("🗑️ Clear Chat History"):
             st.session_state.messages = []
+            _reset_rendered()
             st.rerun()
 
         st.markdown("---")
@@ -149,52 +276,100 @@ def setup_sidebar():
         return selected_model, temperature
 
 
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _create_llm(model_name, temperature):
+    """Create a ChatOllama instance, shared across reruns for the same settings
+
+    Only the most recent few settings are kept, since every instance holds its
+    own pair of HTTP clients.
+    """
+    # Imported here: langchain_ollama is slow to import and unused until a model is chosen
+    from langchain_ollama import ChatOllama
+
+    return ChatOllama(model=model_name, temperature=temperature, base_url=OLLAMA_HOST)
+
+
 def initialize_llm(model_name, temperature):
     """Initialize or update the LLM instance"""
     try:
-        llm = ChatOllama(
-            model=model_name, temperature=temperature, base_url="http://localhost:11434"
-        )
-        return llm
+        return _create_llm(model_name, temperature)
     except Exception as e:
         st.error(f"Failed to connect to Ollama: {e!s}")
         st.info("Make sure Ollama is running. Start it with: `ollama serve`")
         return None
 
 
-def display_chat_messages(stream=False):
-    """Display all chat messages"""
-    if stream:
-        st.markdown(
-            f"""
-                <div class="chat-message assistant-message">
-                    <div class="message-header">🤖 Assistant</div>
-                    <div>{st.session_state.messages[-1].content}</div>
-                </div>
-            """,
-            unsafe_allow_html=True,
-        )
-    for message in st.session_state.messages:
-        if isinstance(message, HumanMessage):
-            st.markdown(
-                f"""
-                <div class="chat-message user-message">
-                    <div class="message-header">👤 You</div>
-                    <div>{message.content}</div>
-                </div>
-            """,
-                unsafe_allow_html=True,
-            )
-        elif isinstance(message, AIMessage):
-            st.markdown(
-                f"""
-                <div class="chat-message assistant-message">
-                    <div class="message-header">🤖 Assistant</div>
-                    <div>{message.content}</div>
-                </div>
-            """,
-                unsafe_allow_html=True,
-            )
+def render_message(message):
+    """Build the chat bubble HTML for a message, or None if it isn't displayed"""
+    # Exact-type lookup; types without a template (e.g. SystemMessage) are skipped
+    template = _TEMPLATES.get(type(message))
+    if template is None:
+        return None
+    return template.format(content=html.escape(message.content))
+
+
+def _reset_rendered():
+    """Start the rendered history over; the two parts are only valid together"""
+    # Bubble HTML for each message in `messages` ("" if not displayed)
+    st.session_state.rendered = []
+    # The displayed bubbles' HTML, joined as messages arrive
+    st.session_state.rendered_buffer = io.StringIO()
+
+
+def _write_html(buffer, message_html):
+    """Add a bubble to the end of the joined history HTML"""
+    if message_html:
+        if buffer.tell():
+            buffer.write("\n")
+        buffer.write(message_html)
+
+
+def _append_message(message):
+    """Add a message to the history, rendering its HTML once; returns the HTML"""
+    message_html = render_message(message) or ""
+    st.session_state.messages.append(message)
+    st.session_state.rendered.append(message_html)
+    _write_html(st.session_state.rendered_buffer, message_html)
+    return message_html
+
+
+def display_chat_messages():
+    """Display all chat messages in a single markdown element"""
+    messages = st.session_state.messages
+    if not messages:
+        return
+
+    # Messages are immutable, so each is rendered once and reused on every
+    # rerun; only messages added without _append_message are rendered here
+    if (
+        "rendered" not in st.session_state
+        or "rendered_buffer" not in st.session_state
+        or len(st.session_state.rendered) > len(messages)
+    ):
+        _reset_rendered()
+    rendered = st.session_state.rendered
+    buffer = st.session_state.rendered_buffer
+    for message in messages[len(rendered) :]:
+        message_html = render_message(message) or ""
+        rendered.append(message_html)
+        _write_html(buffer, message_html)
+
+    # getvalue() still copies the joined text, but the per-message joining
+    # happened once, as each message arrived
+    history_html = buffer.getvalue()
+    if history_html:
+        st.markdown(history_html, unsafe_allow_html=True)
+
+
+def display_new_message(message, message_html=None):
+    """Display one message below the history without redrawing the history
+
+    Pass the HTML returned by _append_message to draw it without rendering again.
+    """
+    if message_html is None:
+        message_html = render_message(message)
+    if message_html:
+        st.markdown(message_html, unsafe_allow_html=True)
 
 
 def main():
@@ -212,6 +387,15 @@ def main():
         st.code("ollama pull llama3.2:3b", language="bash")
         return
 
+    display_chat_messages()
+
+    user_input = st.chat_input("Type your message here...")
+
+    if not user_input:
+        return
+
+    # The LLM is only needed once there is something to send, so page views
+    # that never chat don't import or construct it
     llm = initialize_llm(selected_model, temperature)
 
     if llm is None:
@@ -221,33 +405,35 @@ def main():
 
     st.session_state.llm = llm
 
-    display_chat_messages()
-
-    user_input = st.chat_input("Type your message here...")
-
-    if user_input:
-        st.session_state.messages.append(HumanMessage(content=user_input))
-
-        with st.spinner("🤔 Thinking..."):
-            try:
-                print("Invoking LLM...")
-                response = st.session_state.llm.stream([HumanMessage(content=user_input)])
-                for chunk in response:
-                    if chunk.text:
-                        if len(st.session_state.messages) == 0 or not isinstance(
-                            st.session_state.messages[-1], AIMessage
-                        ):
-                            st.session_state.messages.append(AIMessage(content=chunk.text))
-                        else:
-                            st.session_state.messages[-1].content += chunk.text
-                        display_chat_messages(stream=True)
-                st.session_state.messages.append(AIMessage(content=response.content))
-            except Exception as e:
-                print(e, "here")
-                st.session_state.error = f"Error generating response: {e!s}"
-                st.info("Please check if the model is downloaded and Ollama is running.")
-
-        st.rerun()
+    user_message = HumanMessage(content=user_input)
+    display_new_message(user_message, _append_message(user_message))
+
+    # History is already on screen; only this bubble is redrawn per chunk
+    placeholder = st.empty()
+    response_text = ""
+    with st.spinner("🤔 Thinking..."):
+        try:
+            print("Invoking LLM...")
+            # Send the whole conversation so the model has context and Ollama
+            # can reuse its cached prompt prefix from earlier turns
+            response = st.session_state.llm.stream(list(st.session_state.messages))
+            # Accumulate locally instead of type-checking and mutating the last
+            # history entry on every chunk; the reply is stored once at the end
+            for chunk in response:
+                if chunk.text:
+                    response_text += chunk.text
+                    placeholder.markdown(
+                        _AI_TMPL.format(content=html.escape(response_text)),
+                        unsafe_allow_html=True,
+                    )
+        except Exception as e:
+            print(e, "here")
+            st.session_state.error = f"Error generating response: {e!s}"
+            st.info("Please check if the model is downloaded and Ollama is running.")
+
+    # A partial reply is kept, as before, if the stream failed midway
+    if response_text:
+        _append_message(AIMessage(content=response_text))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,359 @@
+import asyncio
+import io
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage
+from rich.console import Console
+from rich.live import Live
+from rich.text import Text
+
+from cli_chatbot import _MAX_LIVE_CHARS, CliChatbot
+
+
+def _conversation(turns):
+    """Build a history of complete user/assistant turns"""
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"Question {i}"))
+        messages.append(AIMessage(content=f"Answer {i}"))
+    return messages
+
+
+def _fake_stream(chunks, error=None):
+    """Build a stream_response replacement yielding the given chunks, then raising"""
+
+    async def stream_response(messages):
+        for chunk in chunks:
+            yield chunk
+        if error is not None:
+            raise error
+
+    return stream_response
+
+
+@pytest.fixture
+def chatbot(monkeypatch):
+    """A CliChatbot with a recording console and a fake LLM"""
+    # PromptSession wants a real terminal; the tests feed input themselves
+    monkeypatch.setattr("cli_chatbot.PromptSession", Mock())
+    bot = CliChatbot()
+    bot.console = Console(file=io.StringIO(), width=80)
+    bot.llm = Mock()
+    bot.llm.ainvoke = AsyncMock(return_value=AIMessage(content="Earlier summary"))
+    return bot
+
+
+class TestContextMessages:
+    """Test cases for CliChatbot._context_messages"""
+
+    def test_context_window_size(self, chatbot):
+        """Test that the last 2 * max_turns - 1 messages are sent, starting on a user message"""
+        chatbot.max_turns = 2
+        chatbot.messages = [*_conversation(3), HumanMessage(content="Question 3")]
+
+        context = chatbot._context_messages()
+
+        assert context == chatbot.messages[-3:]
+        assert isinstance(context[0], HumanMessage)
+        assert context[-1].content == "Question 3"
+
+    def test_short_history_sent_whole(self, chatbot):
+        """Test that a history shorter than the window is sent unchanged"""
+        chatbot.messages = [HumanMessage(content="Hello")]
+
+        assert chatbot._context_messages() == chatbot.messages
+
+    def test_context_starts_with_summary(self, chatbot):
+        """Test that the rolling summary is sent as a system message before the window"""
+        chatbot.max_turns = 2
+        chatbot.messages = [*_conversation(3), HumanMessage(content="Question 3")]
+        chatbot.summary = "The user asked about tests."
+
+        context = chatbot._context_messages()
+
+        assert isinstance(context[0], SystemMessage)
+        assert "The user asked about tests." in context[0].content
+        assert context[1:] == chatbot.messages[-3:]
+
+
+class TestSummarizeOverflow:
+    """Test cases for the rolling conversation summary"""
+
+    def test_summarizes_messages_leaving_the_window(self, chatbot):
+        """Test that exactly the messages the next turn won't send are summarized"""
+        chatbot.max_turns = 2
+        chatbot.messages = _conversation(3)
+
+        async def scenario():
+            chatbot._summarize_overflow()
+            await chatbot._summary_task
+
+        asyncio.run(scenario())
+
+        # cutoff = len - 2 * max_turns + 2
+        assert chatbot._summarized == 4
+        assert chatbot.summary == "Earlier summary"
+        transcript = chatbot.llm.ainvoke.call_args[0][0][1].content
+        assert "Question 1" in transcript
+        assert "Answer 1" in transcript
+        assert "Question 2" not in transcript
+
+        # The next turn's window begins right where the summary ends
+        chatbot.messages.append(HumanMessage(content="Question 3"))
+        assert chatbot._context_messages()[1:] == chatbot.messages[4:]
+
+    def test_previous_summary_is_extended(self, chatbot):
+        """Test that the previous summary is sent along with the new messages"""
+        chatbot.max_turns = 2
+        chatbot.messages = _conversation(4)
+        chatbot.summary = "First summary"
+        chatbot._summarized = 4
+
+        async def scenario():
+            chatbot._summarize_overflow()
+            await chatbot._summary_task
+
+        asyncio.run(scenario())
+
+        transcript = chatbot.llm.ainvoke.call_args[0][0][1].content
+        assert "First summary" in transcript
+        assert "Question 2" in transcript
+        assert "Question 1" not in transcript
+        assert chatbot._summarized == 6
+
+    def test_nothing_to_summarize_within_window(self, chatbot):
+        """Test that no summary request is made while the history fits the window"""
+        chatbot.max_turns = 2
+        chatbot.messages = _conversation(1)
+
+        chatbot._summarize_overflow()
+
+        assert chatbot._summary_task is None
+        chatbot.llm.ainvoke.assert_not_called()
+
+    def test_summary_discarded_after_clear(self, chatbot):
+        """Test that a summary finishing after /clear doesn't leak into the new conversation"""
+        chatbot.max_turns = 2
+        chatbot.messages = _conversation(3)
+
+        async def scenario():
+            release = asyncio.Event()
+
+            async def slow_summary(messages):
+                await release.wait()
+                return AIMessage(content="Stale summary")
+
+            chatbot.llm.ainvoke = AsyncMock(side_effect=slow_summary)
+            chatbot._summarize_overflow()
+            await asyncio.sleep(0)
+            chatbot.clear_history()
+            release.set()
+            await chatbot._summary_task
+
+        asyncio.run(scenario())
+
+        assert chatbot.summary == ""
+        assert chatbot._summarized == 0
+
+    def test_summary_failure_keeps_previous(self, chatbot):
+        """Test that a failed summary request leaves the previous summary in place"""
+        chatbot.max_turns = 2
+        chatbot.messages = _conversation(3)
+        chatbot.summary = "First summary"
+        chatbot.llm.ainvoke = AsyncMock(side_effect=ConnectionError("Connection refused"))
+
+        async def scenario():
+            chatbot._summarize_overflow()
+            await chatbot._summary_task
+
+        asyncio.run(scenario())
+
+        assert chatbot.summary == "First summary"
+        assert chatbot._summarized == 0
+
+
+class TestRunTurns:
+    """Test cases for how CliChatbot.run records turns"""
+
+    @pytest.fixture
+    def run_chat(self, chatbot, monkeypatch):
+        """Run the chat loop over the given inputs with the given streamed reply"""
+
+        def run(inputs, astream):
+            llm = Mock()
+            llm.astream = astream
+            llm.ainvoke = AsyncMock(return_value=AIMessage(content="Earlier summary"))
+            monkeypatch.setattr("cli_chatbot._fetch_models", AsyncMock(return_value=["x"]))
+            monkeypatch.setattr("cli_chatbot.ChatOllama", Mock(return_value=llm))
+            chatbot.session.prompt_async = AsyncMock(side_effect=[*inputs, "/quit"])
+            asyncio.run(chatbot.run())
+            return chatbot.console.file.getvalue()
+
+        return run
+
+    def test_reply_is_recorded(self, chatbot, run_chat):
+        """Test that a completed reply is added to the history after the user message"""
+
+        async def astream(messages):
+            yield AIMessageChunk(content="Hi there")
+
+        run_chat(["Hello"], astream)
+
+        assert chatbot.messages == [HumanMessage(content="Hello"), AIMessage(content="Hi there")]
+
+    def test_failed_reply_is_dropped(self, chatbot, run_chat):
+        """Test that a failed stream shows the error but records no turn and no summary"""
+
+        async def astream(messages):
+            yield AIMessageChunk(content="Partial")
+            raise ConnectionError("Connection refused")
+
+        output = run_chat(["Hello"], astream)
+
+        assert chatbot.messages == []
+        assert chatbot._summary_task is None
+        assert "Connection refused" in output
+
+
+class TestStreamToLive:
+    """Test cases for CliChatbot._stream_to_live"""
+
+    @pytest.fixture
+    def recorded_live(self):
+        """A Live display on a recording, non-terminal console"""
+        console = Console(file=io.StringIO(), width=80)
+        with Live(console=console, auto_refresh=False) as live:
+            yield live
+
+    def test_returns_full_text(self, chatbot, recorded_live):
+        """Test that the streamed chunks are joined, shown and returned"""
+        chatbot.stream_response = _fake_stream(["Hello", " world"])
+
+        result = asyncio.run(chatbot._stream_to_live([], recorded_live))
+        recorded_live.stop()
+
+        assert result == "Hello world"
+        assert "Hello world" in recorded_live.console.file.getvalue()
+
+    def test_long_reply_commits_each_paragraph_once(self, chatbot, recorded_live):
+        """Test that finished paragraphs leave the live area and are printed exactly once"""
+        paragraphs = [f"Paragraph {i} " + "x" * 300 for i in range(12)]
+        chatbot.stream_response = _fake_stream([f"{p}\n\n" for p in paragraphs])
+        offsets = []
+        commit = chatbot._commit_paragraphs
+
+        def recording_commit(*args):
+            offsets.append(commit(*args))
+            return offsets[-1]
+
+        chatbot._commit_paragraphs = recording_commit
+
+        result = asyncio.run(chatbot._stream_to_live([], recorded_live))
+        recorded_live.stop()
+
+        assert result == "".join(f"{p}\n\n" for p in paragraphs)
+        assert max(offsets) > 0
+        output = recorded_live.console.file.getvalue().replace("\n", "")
+        for i in range(12):
+            assert output.count(f"Paragraph {i} ") == 1
+
+    def test_renders_are_throttled(self, chatbot, monkeypatch):
+        """Test that chunks arriving within one flush interval don't each re-render"""
+        monkeypatch.setattr("cli_chatbot.time", SimpleNamespace(monotonic=lambda: 100.0))
+        chatbot.stream_response = _fake_stream(["a"] * 100)
+        live = Mock()
+
+        result = asyncio.run(chatbot._stream_to_live([], live))
+
+        assert result == "a" * 100
+        # One render for the first chunk, one final render
+        assert live.update.call_count == 2
+        assert live.update.call_args[0][0].plain == "a" * 100
+
+    def test_paragraph_break_flushes_immediately(self, chatbot, monkeypatch):
+        """Test that a paragraph break renders even within the flush interval"""
+        monkeypatch.setattr("cli_chatbot.time", SimpleNamespace(monotonic=lambda: 100.0))
+        chatbot.stream_response = _fake_stream(["a", "b", "c\n\n", "d"])
+        live = Mock()
+
+        asyncio.run(chatbot._stream_to_live([], live))
+
+        rendered = [call[0][0].plain for call in live.update.call_args_list]
+        assert rendered == ["a", "abc\n\n", "abc\n\nd"]
+
+    def test_plain_reply_renders_as_text(self, chatbot):
+        """Test that a reply without Markdown characters is never parsed as Markdown"""
+        chatbot.stream_response = _fake_stream(["Hello", " there", "\n\nHow are you"])
+        live = Mock()
+
+        asyncio.run(chatbot._stream_to_live([], live))
+
+        assert all(type(call[0][0]) is Text for call in live.update.call_args_list)
+
+    def test_switches_to_markdown_on_first_sigil(self, chatbot):
+        """Test that rendering moves to Markdown once a Markdown character is streamed"""
+        from rich.markdown import Markdown
+
+        chatbot.stream_response = _fake_stream(["Hello\n\n", "**bold**\n\n", "more"])
+        live = Mock()
+
+        asyncio.run(chatbot._stream_to_live([], live))
+
+        renders = [call[0][0] for call in live.update.call_args_list]
+        assert type(renders[0]) is Text
+        assert all(isinstance(render, Markdown) for render in renders[1:])
+        assert renders[-1].markup == "Hello\n\n**bold**\n\nmore"
+
+    def test_stream_error_returns_none(self, chatbot, recorded_live):
+        """Test that a failed stream shows the partial reply and the error, but returns None"""
+        chatbot.stream_response = _fake_stream(["Partial"], ConnectionError("Connection refused"))
+
+        result = asyncio.run(chatbot._stream_to_live([], recorded_live))
+        recorded_live.stop()
+
+        assert result is None
+        output = recorded_live.console.file.getvalue()
+        assert "Partial" in output
+        assert "[Error: Connection refused]" in output
+
+
+class TestCommitParagraphs:
+    """Test cases for CliChatbot._commit_paragraphs"""
+
+    def test_short_text_stays_live(self, chatbot):
+        """Test that nothing is committed while the live area is under the limit"""
+        live = Mock()
+
+        assert chatbot._commit_paragraphs("short\n\ntext", 0, live, Text) == 0
+        live.console.print.assert_not_called()
+
+    def test_commits_up_to_last_paragraph_break(self, chatbot):
+        """Test that everything before the last paragraph break is printed"""
+        text = "a" * _MAX_LIVE_CHARS + "\n\n" + "tail"
+        live = Mock()
+
+        committed = chatbot._commit_paragraphs(text, 0, live, Text)
+
+        assert text[committed:] == "tail"
+        assert live.console.print.call_args[0][0].plain == "a" * _MAX_LIVE_CHARS
+
+    def test_never_splits_inside_code_fence(self, chatbot):
+        """Test that a paragraph break inside an open code fence is not a split point"""
+        text = "```python\n" + "x = 1\n" * 400 + "\n" + "y = 2\n" * 10
+        live = Mock()
+
+        assert chatbot._commit_paragraphs(text, 0, live, Text) == 0
+        live.console.print.assert_not_called()
+
+    def test_splits_after_closed_code_fence(self, chatbot):
+        """Test that a paragraph break after a closed fence can be committed"""
+        fenced = "```python\n" + "x = 1\n" * 400 + "```"
+        text = fenced + "\n\n" + "After the code"
+        live = Mock()
+
+        committed = chatbot._commit_paragraphs(text, 0, live, Text)
+
+        assert text[committed:] == "After the code"
+        assert live.console.print.call_args[0][0].plain == fenced
@@ -1,46 +1,136 @@
-from unittest.mock import MagicMock, Mock, patch
-
+import asyncio
+import html
+import io
+import os
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-# Import functions from main
-from main import (
+from main import run_ui_mode
+
+# Import functions from the Streamlit app module
+from streamlit_chatbot import (
+    _AI_TMPL,
+    _USER_TMPL,
+    _append_message,
+    _create_llm,
+    _get_ollama_client,
+    _list_models,
+    _ollama_host,
+    aget_available_models,
     display_chat_messages,
+    display_new_message,
     get_available_models,
     initialize_llm,
     initialize_session_state,
     setup_sidebar,
 )
 
+# Messages are immutable values, so tests that don't need their own can share this one
+_SAMPLE_HUMAN = HumanMessage(content="test")
+
+
+class FakeState(dict):
+    """Dict with attribute access, the same shape as st.session_state"""
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start each test with empty caches so mocked clients are always hit"""
+    _list_models.clear()
+    _get_ollama_client.cache_clear()
+    _create_llm.clear()
+
+
+@pytest.fixture(autouse=True)
+def no_prewarm(monkeypatch):
+    """Keep the per-session pre-warm thread from reaching the network"""
+    mock = Mock()
+    monkeypatch.setattr("streamlit_chatbot._prewarm_ollama", mock)
+    return mock
+
+
+@pytest.fixture(autouse=True)
+def default_ollama_host(monkeypatch):
+    """Use the default server URL even if the developer's shell sets OLLAMA_HOST"""
+    monkeypatch.setattr("streamlit_chatbot.OLLAMA_HOST", "http://localhost:11434")
+
+
+@pytest.fixture
+def mock_streamlit(monkeypatch):
+    """Replace the Streamlit calls the sidebar makes, yielding the mocks by name"""
+    import streamlit as st
+
+    mocks = SimpleNamespace(
+        sidebar=MagicMock(),
+        title=MagicMock(),
+        markdown=MagicMock(),
+        selectbox=MagicMock(),
+        slider=MagicMock(),
+        button=MagicMock(),
+        rerun=MagicMock(),
+        error=MagicMock(),
+        info=MagicMock(),
+        warning=MagicMock(),
+    )
+    for name, mock in vars(mocks).items():
+        monkeypatch.setattr(st, name, mock)
+    # main.py exports these when launching the UI; don't let a caller's shell leak in
+    monkeypatch.delenv("CHATBOT_MODEL", raising=False)
+    monkeypatch.delenv("CHATBOT_TEMPERATURE", raising=False)
+    return mocks
+
+
+@pytest.fixture
+def mock_get_models(monkeypatch):
+    """Replace get_available_models so the sidebar never reaches Ollama"""
+    mock = Mock()
+    monkeypatch.setattr("streamlit_chatbot.get_available_models", mock)
+    return mock
+
 
 class TestInitializeSessionState:
     """Test cases for initialize_session_state function"""
 
     def test_initialize_empty_session_state(self):
         """Test initializing session state when empty"""
-        # Create a mock session state object
-        mock_session = MagicMock()
-        mock_session.__contains__ = Mock(return_value=False)
+        mock_session = FakeState()
 
-        with patch("main.st.session_state", mock_session):
+        with patch("streamlit_chatbot.st.session_state", mock_session):
             initialize_session_state()
 
-        # Verify that messages and llm attributes were accessed for assignment
-        # The session state should now have these attributes set
+        # The session state should now have these keys set
         assert hasattr(mock_session, "messages")
         assert hasattr(mock_session, "llm")
 
-    def test_initialize_existing_messages(self):
-        """Test that existing messages are not overwritten"""
-        existing_messages = [HumanMessage(content="test")]
-        mock_session = MagicMock()
+    def test_initialize_adds_rendered(self):
+        """Test that a new session gets an empty rendered-HTML cache"""
+        mock_session = FakeState()
+
+        with patch("streamlit_chatbot.st.session_state", mock_session):
+            initialize_session_state()
 
-        def contains_check(key):
-            return key == "messages"
+        assert mock_session.rendered == []
+        assert mock_session.rendered_buffer.getvalue() == ""
 
-        mock_session.__contains__ = Mock(side_effect=contains_check)
+    def test_initialize_existing_messages(self):
+        """Test that existing messages are not overwritten"""
+        existing_messages = [_SAMPLE_HUMAN]
+        mock_session = FakeState()
         mock_session.messages = existing_messages
 
-        with patch("main.st.session_state", mock_session):
+        with patch("streamlit_chatbot.st.session_state", mock_session):
             initialize_session_state()
 
         # messages should not be overwritten, so it should still be the existing one
@@ -49,39 +139,55 @@ class TestInitializeSessionState:
     def test_initialize_existing_llm(self):
         """Test that existing llm instance is not overwritten"""
         existing_llm = Mock()
-        mock_session = MagicMock()
-
-        def contains_check(key):
-            return key == "llm"
-
-        mock_session.__contains__ = Mock(side_effect=contains_check)
+        mock_session = FakeState()
         mock_session.llm = existing_llm
 
-        with patch("main.st.session_state", mock_session):
+        with patch("streamlit_chatbot.st.session_state", mock_session):
             initialize_session_state()
 
         # llm should not be overwritten
         assert mock_session.llm == existing_llm
 
+    @patch("streamlit_chatbot.threading.Thread")
+    def test_initialize_session_state_prewarms(self, mock_thread):
+        """Test that a new session starts the background Ollama pre-warm once"""
+        mock_session = FakeState()
+
+        with patch("streamlit_chatbot.st.session_state", mock_session):
+            initialize_session_state()
+
+        mock_thread.return_value.start.assert_called_once()
+        assert mock_session.prewarmed is True
+
+    @patch("streamlit_chatbot.threading.Thread")
+    def test_initialize_session_state_prewarms_only_once(self, mock_thread):
+        """Test that reruns of an existing session don't pre-warm again"""
+        mock_session = FakeState(messages=[], llm=None, prewarmed=True)
+
+        with patch("streamlit_chatbot.st.session_state", mock_session):
+            initialize_session_state()
+
+        mock_thread.assert_not_called()
+
 
 class TestGetAvailableModels:
     """Test cases for get_available_models function"""
 
-    @patch("main.Client")
+    @patch("ollama.Client")
     def test_get_available_models_success(self, mock_client_class):
         """Test successful model fetching"""
         # Create mock models
-        mock_model1 = Mock()
+        mock_model1 = Mock(spec_set=["model"])
         mock_model1.model = "llama3.2:3b"
-        mock_model2 = Mock()
+        mock_model2 = Mock(spec_set=["model"])
         mock_model2.model = "phi3:mini"
 
         # Create mock response
-        mock_response = Mock()
+        mock_response = Mock(spec_set=["models"])
         mock_response.models = [mock_model1, mock_model2]
 
         # Setup mock client
-        mock_client_instance = Mock()
+        mock_client_instance = Mock(spec_set=["list"])
         mock_client_instance.list.return_value = mock_response
         mock_client_class.return_value = mock_client_instance
 
@@ -90,12 +196,12 @@ class TestGetAvailableModels:
 
         # Assertions
         assert success is True
-        assert models == ["llama3.2:3b", "phi3:mini"]
+        assert models == ("llama3.2:3b", "phi3:mini")
         assert error_msg == ""
         mock_client_class.assert_called_once_with(host="http://localhost:11434")
         mock_client_instance.list.assert_called_once()
 
-    @patch("main.Client")
+    @patch("ollama.Client")
     def test_get_available_models_connection_error(self, mock_client_class):
         """Test Ollama connection error"""
         # Simulate connection error
@@ -106,19 +212,19 @@ class TestGetAvailableModels:
 
         # Assertions
         assert success is False
-        assert models == []
+        assert models == ()
         assert "Failed to connect to Ollama" in error_msg
         assert "Connection refused" in error_msg
 
-    @patch("main.Client")
+    @patch("ollama.Client")
     def test_get_available_models_empty_list(self, mock_client_class):
         """Test when no models are installed"""
         # Create mock response with empty models list
-        mock_response = Mock()
+        mock_response = Mock(spec_set=["models"])
         mock_response.models = []
 
         # Setup mock client
-        mock_client_instance = Mock()
+        mock_client_instance = Mock(spec_set=["list"])
         mock_client_instance.list.return_value = mock_response
         mock_client_class.return_value = mock_client_instance
 
@@ -127,14 +233,46 @@ class TestGetAvailableModels:
 
         # Assertions
         assert success is True
-        assert models == []
+        assert models == ()
         assert error_msg == ""
 
-    @patch("main.Client")
+    @patch("ollama.Client")
+    def test_get_available_models_is_cached(self, mock_client_class):
+        """Test that repeated calls reuse the cached model list"""
+        mock_model = Mock(spec_set=["model"])
+        mock_model.model = "llama3.2:3b"
+        mock_response = Mock(spec_set=["models"])
+        mock_response.models = [mock_model]
+        mock_client_class.return_value.list.return_value = mock_response
+
+        first = get_available_models()
+        second = get_available_models()
+
+        assert first == second == (True, ("llama3.2:3b",), "")
+        assert mock_client_class.call_count == 1
+
+    @patch("ollama.Client")
+    def test_get_available_models_errors_not_cached(self, mock_client_class):
+        """Test that a failed fetch is retried on the next call"""
+        mock_response = Mock(spec_set=["models"])
+        mock_response.models = []
+        mock_client_class.return_value.list.side_effect = [
+            Exception("Connection refused"),
+            mock_response,
+        ]
+
+        success, _, _ = get_available_models()
+        assert success is False
+
+        success, models, _ = get_available_models()
+        assert success is True
+        assert models == ()
+
+    @patch("ollama.Client")
     def test_get_available_models_api_error(self, mock_client_class):
         """Test API error handling"""
         # Setup mock client that raises exception on list()
-        mock_client_instance = Mock()
+        mock_client_instance = Mock(spec_set=["list"])
         mock_client_instance.list.side_effect = Exception("API Error")
         mock_client_class.return_value = mock_client_instance
 
@@ -143,155 +281,192 @@ class TestGetAvailableModels:
 
         # Assertions
         assert success is False
-        assert models == []
+        assert models == ()
         assert "Failed to connect to Ollama" in error_msg
         assert "API Error" in error_msg
 
 
+def _async_client_for(hosts):
+    """Build an ollama.AsyncClient stand-in whose list() result depends on the host"""
+
+    def make_client(host):
+        client = MagicMock()
+        client.__aenter__.return_value = client
+        client.list = AsyncMock(side_effect=hosts[host])
+        return client
+
+    return make_client
+
+
+class TestAsyncGetAvailableModels:
+    """Test cases for aget_available_models function"""
+
+    @patch("ollama.AsyncClient")
+    def test_aget_available_models_per_host(self, mock_client_class):
+        """Test that each host gets its own result, in the order given"""
+        model = Mock()
+        model.model = "llama3.2:3b"
+        mock_client_class.side_effect = _async_client_for(
+            {
+                "http://a:11434": [Mock(models=[model])],
+                "http://b:11434": ConnectionError("Connection refused"),
+            }
+        )
+
+        results = asyncio.run(aget_available_models(("http://a:11434", "http://b:11434")))
+
+        assert results[0] == (True, ("llama3.2:3b",), "")
+        success, models, error_msg = results[1]
+        assert success is False
+        assert models == ()
+        assert "http://b:11434" in error_msg
+        assert "Connection refused" in error_msg
+
+    @patch("ollama.AsyncClient")
+    def test_aget_available_models_runs_concurrently(self, mock_client_class):
+        """Test that all hosts are listed at the same time rather than one by one"""
+        in_flight = 0
+        peak = 0
+
+        async def slow_list():
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return Mock(models=[])
+
+        hosts = ("http://a:11434", "http://b:11434", "http://c:11434")
+        mock_client_class.side_effect = _async_client_for(dict.fromkeys(hosts, slow_list))
+
+        results = asyncio.run(aget_available_models(hosts))
+
+        assert peak == 3
+        assert results == [(True, (), "")] * 3
+
+
 class TestSetupSidebar:
     """Test cases for setup_sidebar function"""
 
-    @patch("main.get_available_models")
-    @patch("streamlit.sidebar")
-    @patch("streamlit.title")
-    @patch("streamlit.markdown")
-    @patch("streamlit.selectbox")
-    @patch("streamlit.slider")
-    @patch("streamlit.button")
-    def test_setup_sidebar_returns_model_and_temperature(
-        self,
-        mock_button,
-        mock_slider,
-        mock_selectbox,
-        mock_markdown,
-        mock_title,
-        mock_sidebar,
-        mock_get_models,
-    ):
+    def test_setup_sidebar_returns_model_and_temperature(self, mock_streamlit, mock_get_models):
         """Test sidebar setup returns correct model and temperature"""
         # Mock get_available_models to return success with models
-        mock_get_models.return_value = (True, ["llama3.2:3b", "phi3:mini"], "")
+        mock_get_models.return_value = (True, ("llama3.2:3b", "phi3:mini"), "")
 
-        mock_selectbox.return_value = "llama3.2:3b"
-        mock_slider.return_value = 0.7
-        mock_button.return_value = False
+        mock_streamlit.selectbox.return_value = "llama3.2:3b"
+        mock_streamlit.slider.return_value = 0.7
+        mock_streamlit.button.return_value = False
 
-        with patch("streamlit.sidebar"):
-            model, temp = setup_sidebar()
+        model, temp = setup_sidebar()
 
         assert model == "llama3.2:3b"
         assert temp == 0.7
 
-    @patch("main.get_available_models")
-    @patch("streamlit.sidebar")
-    @patch("streamlit.title")
-    @patch("streamlit.markdown")
-    @patch("streamlit.selectbox")
-    @patch("streamlit.slider")
-    @patch("streamlit.button")
-    @patch("streamlit.rerun")
-    def test_clear_chat_history_button(
-        self,
-        mock_rerun,
-        mock_button,
-        mock_slider,
-        mock_selectbox,
-        mock_markdown,
-        mock_title,
-        mock_sidebar,
-        mock_get_models,
-    ):
+    def test_clear_chat_history_button(self, mock_streamlit, mock_get_models):
         """Test that clicking clear button clears messages and reruns"""
         # Mock get_available_models to return success with models
-        mock_get_models.return_value = (True, ["llama3.2:3b", "phi3:mini"], "")
+        mock_get_models.return_value = (True, ("llama3.2:3b", "phi3:mini"), "")
 
-        mock_selectbox.return_value = "llama3.2:3b"
-        mock_slider.return_value = 0.7
-        mock_button.return_value = True
+        mock_streamlit.selectbox.return_value = "llama3.2:3b"
+        mock_streamlit.slider.return_value = 0.7
+        mock_streamlit.button.return_value = True
 
-        mock_session = MagicMock()
-        mock_session.messages = [HumanMessage(content="test")]
+        mock_session = FakeState()
+        mock_session.messages = [_SAMPLE_HUMAN]
 
-        with patch("streamlit.sidebar"), patch("main.st.session_state", mock_session):
+        with patch("streamlit_chatbot.st.session_state", mock_session):
             setup_sidebar()
 
         # Note: The actual clearing happens in the sidebar code
         # This test verifies the button can be clicked
-        mock_button.assert_called()
-
-    @patch("main.get_available_models")
-    @patch("streamlit.sidebar")
-    @patch("streamlit.title")
-    @patch("streamlit.markdown")
-    @patch("streamlit.selectbox")
-    @patch("streamlit.slider")
-    @patch("streamlit.button")
-    def test_sidebar_model_options(
-        self,
-        mock_button,
-        mock_slider,
-        mock_selectbox,
-        mock_markdown,
-        mock_title,
-        mock_sidebar,
-        mock_get_models,
+        mock_streamlit.button.assert_called()
+        mock_streamlit.rerun.assert_called_once()
+        assert mock_session.messages == []
+        assert mock_session.rendered == []
+        assert mock_session.rendered_buffer.getvalue() == ""
+
+    @patch("streamlit_chatbot._list_models")
+    def test_refresh_button_clears_model_cache(
+        self, mock_list_models, mock_streamlit, mock_get_models
     ):
+        """Test that clicking refresh drops the cached model list before fetching"""
+        mock_get_models.return_value = (True, ("llama3.2:3b",), "")
+        mock_streamlit.selectbox.return_value = "llama3.2:3b"
+        mock_streamlit.slider.return_value = 0.7
+        mock_streamlit.button.side_effect = lambda label, **kwargs: "Refresh" in label
+
+        setup_sidebar()
+
+        mock_list_models.clear.assert_called_once()
+        mock_get_models.assert_called_once()
+
+    def test_sidebar_model_options(self, mock_streamlit, mock_get_models):
         """Test that sidebar shows correct model options from Ollama"""
-        expected_models = ["llama3.2:3b", "phi3:mini", "qwen2.5:3b"]
+        expected_models = ("llama3.2:3b", "phi3:mini", "qwen2.5:3b")
         # Mock get_available_models to return these models
         mock_get_models.return_value = (True, expected_models, "")
 
-        mock_selectbox.return_value = "llama3.2:3b"
-        mock_slider.return_value = 0.7
-        mock_button.return_value = False
+        mock_streamlit.selectbox.return_value = "llama3.2:3b"
+        mock_streamlit.slider.return_value = 0.7
+        mock_streamlit.button.return_value = False
 
-        with patch("streamlit.sidebar"):
-            setup_sidebar()
+        setup_sidebar()
 
         # Verify selectbox was called with correct options
-        call_args = mock_selectbox.call_args
+        call_args = mock_streamlit.selectbox.call_args
         assert call_args[0][1] == expected_models
 
-    @patch("main.get_available_models")
-    @patch("streamlit.sidebar")
-    @patch("streamlit.title")
-    @patch("streamlit.markdown")
-    @patch("streamlit.selectbox")
-    @patch("streamlit.slider")
-    @patch("streamlit.button")
-    def test_sidebar_temperature_range(
-        self,
-        mock_button,
-        mock_slider,
-        mock_selectbox,
-        mock_markdown,
-        mock_title,
-        mock_sidebar,
-        mock_get_models,
-    ):
+    def test_sidebar_temperature_range(self, mock_streamlit, mock_get_models):
         """Test that temperature slider has correct range"""
         # Mock get_available_models to return success with models
-        mock_get_models.return_value = (True, ["llama3.2:3b"], "")
+        mock_get_models.return_value = (True, ("llama3.2:3b",), "")
 
-        mock_selectbox.return_value = "llama3.2:3b"
-        mock_slider.return_value = 0.5
-        mock_button.return_value = False
+        mock_streamlit.selectbox.return_value = "llama3.2:3b"
+        mock_streamlit.slider.return_value = 0.5
+        mock_streamlit.button.return_value = False
 
-        with patch("streamlit.sidebar"):
-            setup_sidebar()
+        setup_sidebar()
 
         # Verify slider was called with correct parameters
-        call_kwargs = mock_slider.call_args[1]
+        call_kwargs = mock_streamlit.slider.call_args[1]
         assert call_kwargs["min_value"] == 0.0
         assert call_kwargs["max_value"] == 1.0
         assert call_kwargs["value"] == 0.7
         assert call_kwargs["step"] == 0.1
 
+    def test_sidebar_defaults_from_env(self, mock_streamlit, mock_get_models, monkeypatch):
+        """Test that the model and temperature passed by main.py become the defaults"""
+        monkeypatch.setenv("CHATBOT_MODEL", "phi3:mini")
+        monkeypatch.setenv("CHATBOT_TEMPERATURE", "0.3")
+        mock_get_models.return_value = (True, ("llama3.2:3b", "phi3:mini"), "")
+        mock_streamlit.button.return_value = False
+
+        setup_sidebar()
+
+        assert mock_streamlit.selectbox.call_args[1]["index"] == 1
+        assert mock_streamlit.slider.call_args[1]["value"] == 0.3
+
+    @pytest.mark.parametrize(
+        ("env_value", "expected"),
+        [("warm", 0.7), ("nan", 0.7), ("1.5", 1.0), ("-2", 0.0)],
+    )
+    def test_sidebar_temperature_env_fallback(
+        self, mock_streamlit, mock_get_models, monkeypatch, env_value, expected
+    ):
+        """Test that an unusable CHATBOT_TEMPERATURE falls back or is clamped"""
+        monkeypatch.setenv("CHATBOT_TEMPERATURE", env_value)
+        mock_get_models.return_value = (True, ("llama3.2:3b",), "")
+        mock_streamlit.button.return_value = False
+
+        setup_sidebar()
+
+        assert mock_streamlit.slider.call_args[1]["value"] == expected
+
 
 class TestInitializeLLM:
     """Test cases for initialize_llm function"""
 
-    @patch("main.ChatOllama")
+    @patch("langchain_ollama.ChatOllama")
     def test_initialize_llm_success(self, mock_chat_ollama):
         """Test successful LLM initialization"""
         mock_llm_instance = Mock()
@@ -304,7 +479,31 @@ class TestInitializeLLM:
             model="llama3.2:3b", temperature=0.7, base_url="http://localhost:11434"
         )
 
-    @patch("main.ChatOllama")
+    @patch("langchain_ollama.ChatOllama")
+    def test_initialize_llm_reuses_instance(self, mock_chat_ollama):
+        """Test that identical settings reuse one ChatOllama instance"""
+        mock_chat_ollama.return_value = Mock()
+
+        first = initialize_llm("llama3.2:3b", 0.7)
+        second = initialize_llm("llama3.2:3b", 0.7)
+
+        assert first is second
+        assert mock_chat_ollama.call_count == 1
+
+    @patch("langchain_ollama.ChatOllama")
+    def test_initialize_llm_cache_is_bounded(self, mock_chat_ollama):
+        """Test that only a bounded number of LLM instances are kept"""
+        mock_chat_ollama.side_effect = lambda **kwargs: Mock()
+
+        first = initialize_llm("llama3.2:3b", 0.0)
+        for step in range(1, 9):
+            initialize_llm("llama3.2:3b", step / 10)
+
+        # Nine distinct settings overflow the cache, so the first is rebuilt
+        assert initialize_llm("llama3.2:3b", 0.0) is not first
+        assert mock_chat_ollama.call_count == 10
+
+    @patch("langchain_ollama.ChatOllama")
     @patch("streamlit.error")
     @patch("streamlit.info")
     def test_initialize_llm_connection_error(self, mock_info, mock_error, mock_chat_ollama):
@@ -317,7 +516,7 @@ class TestInitializeLLM:
         mock_error.assert_called_once()
         mock_info.assert_called_once()
 
-    @patch("main.ChatOllama")
+    @patch("langchain_ollama.ChatOllama")
     def test_initialize_llm_different_temperatures(self, mock_chat_ollama):
         """Test LLM initialization with different temperature values"""
         mock_llm_instance = Mock()
@@ -332,7 +531,7 @@ class TestInitializeLLM:
             call_kwargs = mock_chat_ollama.call_args[1]
             assert call_kwargs["temperature"] == temp
 
-    @patch("main.ChatOllama")
+    @patch("langchain_ollama.ChatOllama")
     def test_initialize_llm_different_models(self, mock_chat_ollama):
         """Test LLM initialization with different models"""
         mock_llm_instance = Mock()
@@ -347,7 +546,7 @@ class TestInitializeLLM:
             call_kwargs = mock_chat_ollama.call_args[1]
             assert call_kwargs["model"] == model
 
-    @patch("main.ChatOllama")
+    @patch("langchain_ollama.ChatOllama")
     def test_initialize_llm_base_url(self, mock_chat_ollama):
         """Test that LLM is initialized with correct base URL"""
         mock_llm_instance = Mock()
@@ -358,6 +557,41 @@ class TestInitializeLLM:
         call_kwargs = mock_chat_ollama.call_args[1]
         assert call_kwargs["base_url"] == "http://localhost:11434"
 
+    def test_ollama_host_reads_env(self, monkeypatch):
+        """Test that OLLAMA_HOST overrides the default server URL"""
+        monkeypatch.delenv("OLLAMA_HOST", raising=False)
+        assert _ollama_host() == "http://localhost:11434"
+
+        monkeypatch.setenv("OLLAMA_HOST", "http://ollama:11434")
+        assert _ollama_host() == "http://ollama:11434"
+
+    @pytest.mark.parametrize(
+        ("env_value", "expected"),
+        [
+            ("0.0.0.0", "http://0.0.0.0:11434"),
+            ("ollama:8080", "http://ollama:8080"),
+            ("https://ollama.example.com", "https://ollama.example.com:443"),
+            ("ollama.example.com:8080/api/", "http://ollama.example.com:8080/api"),
+            ("[::1]", "http://[::1]:11434"),
+        ],
+    )
+    def test_ollama_host_completes_bare_values(self, monkeypatch, env_value, expected):
+        """Test that scheme-less OLLAMA_HOST values become full URLs"""
+        monkeypatch.setenv("OLLAMA_HOST", env_value)
+
+        assert _ollama_host() == expected
+
+    @patch("langchain_ollama.ChatOllama")
+    def test_initialize_llm_respects_env_host(self, mock_chat_ollama, monkeypatch):
+        """Test that the LLM connects to the host taken from OLLAMA_HOST"""
+        monkeypatch.setenv("OLLAMA_HOST", "http://ollama:11434")
+        monkeypatch.setattr("streamlit_chatbot.OLLAMA_HOST", _ollama_host())
+
+        initialize_llm("llama3.2:3b", 0.7)
+
+        call_kwargs = mock_chat_ollama.call_args[1]
+        assert call_kwargs["base_url"] == "http://ollama:11434"
+
 
 class TestDisplayChatMessages:
     """Test cases for display_chat_messages function"""
@@ -365,21 +599,92 @@ class TestDisplayChatMessages:
     @patch("streamlit.markdown")
     def test_display_empty_messages(self, mock_markdown):
         """Test displaying empty message list"""
-        mock_session = MagicMock()
+        mock_session = FakeState()
         mock_session.messages = []
 
-        with patch("main.st.session_state", mock_session):
+        with patch("streamlit_chatbot.st.session_state", mock_session):
             display_chat_messages()
 
         mock_markdown.assert_not_called()
 
+    @patch("streamlit.markdown")
+    def test_display_uses_rendered_cache(self, mock_markdown):
+        """Test that messages added through _append_message are not re-rendered"""
+        mock_session = FakeState(messages=[], rendered=[], rendered_buffer=io.StringIO())
+
+        with patch("streamlit_chatbot.st.session_state", mock_session):
+            for i in range(50):
+                _append_message(HumanMessage(content=f"Question {i}"))
+                _append_message(AIMessage(content=f"Answer {i}"))
+
+            with patch("streamlit_chatbot.render_message") as mock_render:
+                display_chat_messages()
+
+        mock_render.assert_not_called()
+        mock_markdown.assert_called_once()
+        assert mock_markdown.call_args[0][0] == "\n".join(mock_session.rendered)
+        assert len(mock_session.rendered) == 100
+
+    @patch("streamlit.markdown")
+    def test_display_reads_rendered_buffer(self, mock_markdown):
+        """Test that 100 appended messages are shown from the joined buffer in one call"""
+        mock_session = FakeState(messages=[], rendered=[], rendered_buffer=io.StringIO())
+
+        with patch("streamlit_chatbot.st.session_state", mock_session):
+            for i in range(100):
+                _append_message(HumanMessage(content=f"Message {i}"))
+            display_chat_messages()
+
+        mock_markdown.assert_called_once()
+        content = mock_markdown.call_args[0][0]
+        assert content == mock_session.rendered_buffer.getvalue()
+        assert all(f"Message {i}<" in content for i in range(100))
+
+    @patch("streamlit.markdown")
+    def test_display_rebuilds_when_buffer_missing(self, mock_markdown):
+        """Test that a rendered cache without a matching buffer is rebuilt, not shown blank"""
+        messages = [HumanMessage(content="Hello"), AIMessage(content="Hi!")]
+        # e.g. session state carried over from before rendered_buffer existed
+        mock_session = FakeState(
+            messages=messages, rendered=["<stale>", "<stale>"], llm=None, prewarmed=True
+        )
+
+        with patch("streamlit_chatbot.st.session_state", mock_session):
+            initialize_session_state()
+            display_chat_messages()
+
+        content = mock_markdown.call_args[0][0]
+        assert "Hello" in content
+        assert "Hi!" in content
+        assert "<stale>" not in content
+        assert mock_session.rendered_buffer.getvalue() == content
+
+    @patch("streamlit.markdown")
+    def test_display_rendered_holds_only_html(self, mock_markdown):
+        """Test that the cache built during display keeps just each message's bubble HTML"""
+        mock_session = FakeState()
+        mock_session.messages = [
+            SystemMessage(content="Be brief"),
+            HumanMessage(content="Hello"),
+            AIMessage(content="Hi!"),
+        ]
+
+        with patch("streamlit_chatbot.st.session_state", mock_session):
+            display_chat_messages()
+
+        assert mock_session.rendered == [
+            "",
+            _USER_TMPL.format(content="Hello"),
+            _AI_TMPL.format(content="Hi!"),
+        ]
+
     @patch("streamlit.markdown")
     def test_display_human_message(self, mock_markdown):
         """Test displaying human message"""
-        mock_session = MagicMock()
+        mock_session = FakeState()
         mock_session.messages = [HumanMessage(content="Hello")]
 
-        with patch("main.st.session_state", mock_session):
+        with patch("streamlit_chatbot.st.session_state", mock_session):
             display_chat_messages()
 
         assert mock_markdown.call_count == 1
@@ -391,10 +696,10 @@ class TestDisplayChatMessages:
     @patch("streamlit.markdown")
     def test_display_ai_message(self, mock_markdown):
         """Test displaying AI message"""
-        mock_session = MagicMock()
+        mock_session = FakeState()
         mock_session.messages = [AIMessage(content="Hi there!")]
 
-        with patch("main.st.session_state", mock_session):
+        with patch("streamlit_chatbot.st.session_state", mock_session):
             display_chat_messages()
 
         assert mock_markdown.call_count == 1
@@ -406,7 +711,7 @@ class TestDisplayChatMessages:
     @patch("streamlit.markdown")
     def test_display_multiple_messages(self, mock_markdown):
         """Test displaying multiple messages"""
-        mock_session = MagicMock()
+        mock_session = FakeState()
         mock_session.messages = [
             HumanMessage(content="Hello"),
             AIMessage(content="Hi there!"),
@@ -414,34 +719,43 @@ class TestDisplayChatMessages:
             AIMessage(content="I'm doing well!"),
         ]
 
-        with patch("main.st.session_state", mock_session):
+        with patch("streamlit_chatbot.st.session_state", mock_session):
             display_chat_messages()
 
-        assert mock_markdown.call_count == 4
+        # The whole history is emitted as one element, in order
+        assert mock_markdown.call_count == 1
+        call_args = mock_markdown.call_args[0][0]
+        contents = ["Hello", "Hi there!", "How are you?", html.escape("I'm doing well!")]
+        positions = [call_args.index(content) for content in contents]
+        assert positions == sorted(positions)
+        assert call_args.count("user-message") == 2
+        assert call_args.count("assistant-message") == 2
 
     @patch("streamlit.markdown")
     def test_display_message_with_special_characters(self, mock_markdown):
         """Test displaying messages with special characters"""
         special_content = "Test <script>alert('xss')</script> & special chars"
-        mock_session = MagicMock()
+        mock_session = FakeState()
         mock_session.messages = [HumanMessage(content=special_content)]
 
-        with patch("main.st.session_state", mock_session):
+        with patch("streamlit_chatbot.st.session_state", mock_session):
             display_chat_messages()
 
+        # Message content is HTML-escaped so it can't inject markup
         call_args = mock_markdown.call_args[0][0]
-        assert special_content in call_args
+        assert "<script>" not in call_args
+        assert html.escape(special_content) in call_args
 
     @patch("streamlit.markdown")
     def test_display_ignores_system_messages(self, mock_markdown):
         """Test that SystemMessage types are handled (currently ignored)"""
-        mock_session = MagicMock()
+        mock_session = FakeState()
         mock_session.messages = [
             SystemMessage(content="System prompt"),
             HumanMessage(content="Hello"),
         ]
 
-        with patch("main.st.session_state", mock_session):
+        with patch("streamlit_chatbot.st.session_state", mock_session):
             display_chat_messages()
 
         # Only HumanMessage should be displayed
@@ -453,10 +767,10 @@ class TestDisplayChatMessages:
     @patch("streamlit.markdown")
     def test_display_messages_html_structure(self, mock_markdown):
         """Test that messages have correct HTML structure"""
-        mock_session = MagicMock()
+        mock_session = FakeState()
         mock_session.messages = [HumanMessage(content="Test")]
 
-        with patch("main.st.session_state", mock_session):
+        with patch("streamlit_chatbot.st.session_state", mock_session):
             display_chat_messages()
 
         call_args = mock_markdown.call_args[0][0]
@@ -468,17 +782,52 @@ class TestDisplayChatMessages:
         assert call_kwargs.get("unsafe_allow_html") is True
 
 
+class TestDisplayNewMessage:
+    """Test cases for display_new_message function"""
+
+    @patch("streamlit.markdown")
+    def test_display_new_message_single_call(self, mock_markdown):
+        """Test that only the new message is rendered, in one markdown call"""
+        display_new_message(HumanMessage(content="<b>Hello</b>"))
+
+        mock_markdown.assert_called_once()
+        call_args = mock_markdown.call_args
+        assert "&lt;b&gt;Hello&lt;/b&gt;" in call_args[0][0]
+        assert "user-message" in call_args[0][0]
+        assert call_args[1]["unsafe_allow_html"] is True
+
+    @patch("streamlit.markdown")
+    def test_display_new_message_skips_system(self, mock_markdown):
+        """Test that system messages produce no output"""
+        display_new_message(SystemMessage(content="You are a helpful assistant"))
+
+        mock_markdown.assert_not_called()
+
+    @patch("streamlit.markdown")
+    def test_display_new_message_reuses_appended_html(self, mock_markdown):
+        """Test that HTML cached by _append_message is drawn without rendering again"""
+        message = HumanMessage(content="Hello")
+        mock_session = FakeState(messages=[], rendered=[], rendered_buffer=io.StringIO())
+
+        with patch("streamlit_chatbot.st.session_state", mock_session):
+            message_html = _append_message(message)
+            with patch("streamlit_chatbot.render_message") as mock_render:
+                display_new_message(message, message_html)
+
+        mock_render.assert_not_called()
+        mock_markdown.assert_called_once_with(message_html, unsafe_allow_html=True)
+
+
 class TestIntegrationScenarios:
     """Integration tests for common user scenarios"""
 
     def test_new_chat_session_flow(self):
         """Test complete flow for new chat session"""
-        mock_session = MagicMock()
-        mock_session.__contains__ = Mock(return_value=False)
+        mock_session = FakeState()
         mock_session.messages = []
         mock_session.llm = None
 
-        with patch("main.st.session_state", mock_session):
+        with patch("streamlit_chatbot.st.session_state", mock_session):
             # Initialize
             initialize_session_state()
 
@@ -488,7 +837,7 @@ class TestIntegrationScenarios:
 
             assert len(mock_session.messages) == 2
 
-    @patch("main.ChatOllama")
+    @patch("langchain_ollama.ChatOllama")
     def test_model_switching_flow(self, mock_chat_ollama):
         """Test switching between different models"""
         mock_llm = Mock()
@@ -508,7 +857,7 @@ class TestIntegrationScenarios:
 class TestEdgeCases:
     """Test edge cases and boundary conditions"""
 
-    @patch("main.ChatOllama")
+    @patch("langchain_ollama.ChatOllama")
     @patch("streamlit.error")
     @patch("streamlit.info")
     def test_initialize_llm_with_empty_model_name(self, mock_info, mock_error, mock_chat_ollama):
@@ -520,7 +869,7 @@ class TestEdgeCases:
         assert result is None
         mock_error.assert_called_once()
 
-    @patch("main.ChatOllama")
+    @patch("langchain_ollama.ChatOllama")
     def test_initialize_llm_with_boundary_temperatures(self, mock_chat_ollama):
         """Test LLM initialization with boundary temperature values"""
         mock_llm = Mock()
@@ -537,10 +886,10 @@ class TestEdgeCases:
     @patch("streamlit.markdown")
     def test_display_message_with_empty_content(self, mock_markdown):
         """Test displaying message with empty content"""
-        mock_session = MagicMock()
+        mock_session = FakeState()
         mock_session.messages = [HumanMessage(content="")]
 
-        with patch("main.st.session_state", mock_session):
+        with patch("streamlit_chatbot.st.session_state", mock_session):
             display_chat_messages()
 
         assert mock_markdown.call_count == 1
@@ -551,12 +900,37 @@ class TestEdgeCases:
     def test_display_very_long_message(self, mock_markdown):
         """Test displaying very long message"""
         long_content = "A" * 10000
-        mock_session = MagicMock()
+        mock_session = FakeState()
         mock_session.messages = [HumanMessage(content=long_content)]
 
-        with patch("main.st.session_state", mock_session):
+        with patch("streamlit_chatbot.st.session_state", mock_session):
             display_chat_messages()
 
         assert mock_markdown.call_count == 1
         call_args = mock_markdown.call_args[0][0]
         assert long_content in call_args
+
+
+class TestRunUiMode:
+    """Test cases for main.run_ui_mode"""
+
+    @patch("streamlit.web.cli._main_run")
+    def test_run_ui_mode_honours_streamlit_env(self, mock_main_run, monkeypatch):
+        """Test that the web UI is launched like `streamlit run`, STREAMLIT_* variables included"""
+        monkeypatch.setenv("STREAMLIT_SERVER_PORT", "8599")
+        monkeypatch.setenv("STREAMLIT_SERVER_HEADLESS", "true")
+        # Registered so monkeypatch restores them after run_ui_mode sets them
+        monkeypatch.delenv("CHATBOT_MODEL", raising=False)
+        monkeypatch.delenv("CHATBOT_TEMPERATURE", raising=False)
+
+        with pytest.raises(SystemExit) as exc_info:
+            run_ui_mode("phi3:mini", 0.3)
+
+        assert exc_info.value.code == 0
+        script_path = mock_main_run.call_args[0][0]
+        assert os.path.basename(script_path) == "streamlit_chatbot.py"
+        flag_options = mock_main_run.call_args[1]["flag_options"]
+        assert flag_options["server_port"] == 8599
+        assert flag_options["server_headless"] is True
+        assert os.environ["CHATBOT_MODEL"] == "phi3:mini"
+        assert os.environ["CHATBOT_TEMPERATURE"] == "0.3"